@@ -1,13 +1,18 @@
 #!/usr/bin/env python2
 # # -*- coding: utf-8 -*-
 import sys
-import traceback
 import argparse
 import time
 import datetime
-import json
-import csv
 import os
+import codecs
+import collections
+import contextlib
+import functools
+import itertools
+import io
+import operator
+import threading
 from builtins import input
 
 sys.path.append("zk")
@@ -22,7 +27,20 @@ class BasicException(Exception):
     pass
 
 conn = None
-results = []
+
+CSV_BUFFER_SIZE = 64 * 1024
+SNAPSHOT_CACHE_FILE = '.zk_snapshot_cache'
+
+STATUS_MARKERS = {
+    'OK': '[+]',
+    'WARN': '[!]',
+    'FAIL': '[x]',
+    'INFO': '[i]',
+}
+
+# re-read on every run even when the rest of the snapshot comes from the cache
+VOLATILE_INFO_FIELDS = ('SDK build=1', 'Device Time', 'Firmware Version',
+                        'IP Address', 'Subnet Mask', 'Gateway', 'cached')
 
 DEVICE_INFO_FIELDS = [
     'SDK build=1',
@@ -44,53 +62,150 @@ DEVICE_INFO_FIELDS = [
     'MAC',
 ]
 
+SNAPSHOT_FIELDS = ['drift_s', 'cached'] + DEVICE_INFO_FIELDS
+
+DEVICE_INFO_PROBES = [
+    ('ExtendFmt', 'get_extend_fmt'),
+    ('UsrExtFmt', 'get_user_extend_fmt'),
+    ('Face FunOn', 'get_face_fun_on'),
+    ('Face Version', 'get_face_version'),
+    ('Finger Version', 'get_fp_version'),
+    ('Old FW Compat', 'get_compat_old_firmware'),
+    ('Device Time', 'get_time'),
+    ('Firmware Version', 'get_firmware_version'),
+    ('Platform', 'get_platform'),
+    ('Device Name', 'get_device_name'),
+    ('Pin Width', 'get_pin_width'),
+    ('Serial Number', 'get_serialnumber'),
+    ('MAC', 'get_mac'),
+]
+
+NETWORK_INFO_FIELDS = frozenset(['IP Address', 'Subnet Mask', 'Gateway'])
+
+class RunContext(object):
+    """Accumulate structured step results for one run."""
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, step, status, details):
+        """Store a structured result row for later display."""
+        self.results.append((step, str(status).upper(), str(details)))
+
+class SnapshotCache(object):
+    """Thread-safe on-disk store of device info keyed by address and serial."""
+
+    def __init__(self, path, ttl=0):
+        self.ttl = ttl
+        import shelve
+        self._lock = threading.Lock()
+        self._shelf = shelve.open(path)
+
+    def get(self, key, serial):
+        """Return cached info when the serial still matches and the entry is fresh."""
+        with self._lock:
+            entry = self._shelf.get(key)
+        if not entry or entry['serial'] != serial:
+            return None
+        if self.ttl and time.time() - entry['stored'] > self.ttl:
+            return None
+        return dict(entry['info'])
+
+    def put(self, key, serial, info):
+        """Store the non-volatile part of a device info map."""
+        stable = {k: v for k, v in info.items() if k not in VOLATILE_INFO_FIELDS}
+        with self._lock:
+            self._shelf[key] = {'serial': serial, 'stored': time.time(), 'info': stable}
+
+    def close(self):
+        with self._lock:
+            self._shelf.close()
+
+class ConnectionPool(object):
+    """LRU pool of open device connections keyed by (ip, port); capacity None is unbounded."""
+
+    def __init__(self, capacity=None, idle_timeout=300):
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = collections.OrderedDict()
+
+    @staticmethod
+    def _drop(connection):
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
+
+    @contextlib.contextmanager
+    def checkout(self, key, connect):
+        """Yield a live connection for key, reusing an idle one when it still answers."""
+        with self._lock:
+            entry = self._idle.pop(key, None)
+        connection = None
+        if entry is not None:
+            connection, last_used = entry
+            try:
+                if time.time() - last_used > self.idle_timeout:
+                    raise ZKNetworkError('idle connection expired')
+                connection.get_time()
+            except Exception:
+                self._drop(connection)
+                connection = None
+        if connection is None:
+            connection = connect()
+        try:
+            yield connection
+        except Exception:
+            self._drop(connection)
+            raise
+        evicted = []
+        with self._lock:
+            self._idle[key] = (connection, time.time())
+            while self.capacity is not None and len(self._idle) > self.capacity:
+                evicted.append(self._idle.popitem(last=False)[1][0])
+        for stale in evicted:
+            self._drop(stale)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._idle.values())
+            self._idle.clear()
+        for connection, _ in entries:
+            self._drop(connection)
+
+@functools.lru_cache(maxsize=128)
 def styled_title(label):
     """Return a normalized, emphasized section title."""
-    clean = str(label).strip('- ').upper()
-    return '** {} **'.format(clean)
+    return '** %s **' % str(label).strip('- ').upper()
 
 def status_marker(status):
     """Map result status to a visual marker."""
-    normalized = str(status).upper()
-    return {
-        'OK': '[+]',
-        'WARN': '[!]',
-        'FAIL': '[x]',
-        'INFO': '[i]',
-    }.get(normalized, '[?]')
+    marker = STATUS_MARKERS.get(status)
+    if marker is None:
+        marker = STATUS_MARKERS.get(str(status).upper(), '[?]')
+    return marker
 
 def announce_section(title):
     """Print a visually highlighted section title."""
     print('')
     print(styled_title(title))
 
-def add_result(step, status, details):
-    """Store a structured result row for later display."""
-    results.append((step, str(status).upper(), str(details)))
-
-def render_table(title, headers, rows):
+def render_table(title, headers, rows, _tuple=tuple, _map=map, _str=str, _len=len, _max=max):
     """Render text table with aligned columns."""
     if not rows:
         print('')
         print('{}: no data'.format(title))
         return
-    str_rows = [tuple(str(value) for value in row) for row in rows]
-    widths = [len(col) for col in headers]
-    for row in str_rows:
-        for idx, value in enumerate(row):
-            widths[idx] = max(widths[idx], len(value))
-
-    def fmt_row(values):
-        return ' | '.join(val.ljust(width) for val, width in zip(values, widths))
+    str_rows = [_tuple(_map(_str, row)) for row in rows]
+    widths = [_max(_map(_len, column)) for column in zip(headers, *str_rows)]
+    fmt_row = ' | '.join('{:<%d}' % width for width in widths).format
 
     separator = '-+-'.join('-' * width for width in widths)
-    print('')
-    print(styled_title(title))
-    print(fmt_row(headers))
-    print(separator)
-    for row in str_rows:
-        print(fmt_row(row))
-    print(separator)
+    out = ['', styled_title(title), fmt_row(*headers), separator]
+    out.extend(fmt_row(*row) for row in str_rows)
+    out.append(separator)
+    sys.stdout.write('\n'.join(out) + '\n')
 
 def render_keyvalue_table(title, pairs):
     """Render key/value data using the shared table output."""
@@ -119,13 +234,19 @@ def render_sizes_table(connection, title):
             rows.append((clean, ''))
     render_keyvalue_table(title, rows)
 
-def collect_user_rows(users, target_uid=None):
+@functools.lru_cache(maxsize=16)
+def privilege_label(privilege):
+    """Return the display label for a user privilege level."""
+    return 'User' if privilege == const.USER_DEFAULT else 'Admin-%s' % privilege
+
+def collect_user_rows(users, target_uid=None, _privilege_label=privilege_label):
     """Prepare user information rows and find a matching user if requested."""
     rows = []
+    append_row = rows.append
     prev = None
     for user in users:
-        privilege = 'User' if user.privilege == const.USER_DEFAULT else 'Admin-%s' % user.privilege
-        rows.append((
+        privilege = _privilege_label(user.privilege)
+        append_row((
             user.uid,
             user.name,
             privilege,
@@ -138,86 +259,203 @@ def collect_user_rows(users, target_uid=None):
             prev = user
     return rows, prev
 
+def verify_templates(connection, templates, options):
+    """Yield (bulk, single) template pairs, optionally over extra device connections.
+
+    A ZK session answers one command at a time, so with --verify-workers > 1
+    each worker thread opens its own connection instead of sharing connection.
+    """
+    workers = min(options.verify_workers, len(templates))
+    if workers <= 1:
+        for tem in templates:
+            yield tem, connection.get_user_template(tem.uid, tem.fid)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    local = threading.local()
+    opened = []
+    opened_lock = threading.Lock()
+
+    def read_single(tem):
+        worker_conn = getattr(local, 'conn', None)
+        if worker_conn is None:
+            worker_conn = ZK(options.address, port=options.port, timeout=options.timeout, password=options.password, force_udp=options.force_udp, verbose=options.verbose).connect()
+            local.conn = worker_conn
+            with opened_lock:
+                opened.append(worker_conn)
+        return tem, worker_conn.get_user_template(tem.uid, tem.fid)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for pair in executor.map(read_single, templates):
+                yield pair
+    finally:
+        for worker_conn in opened:
+            try:
+                worker_conn.disconnect()
+            except Exception:
+                pass
+
+def clock_drift(device_time, now=None):
+    """Return whole seconds between a device clock reading and local time, None if unknown."""
+    if not isinstance(device_time, datetime.datetime):
+        return None
+    reference = time.time() if now is None else time.mktime(now.timetuple())
+    return abs(int(time.mktime(device_time.timetuple())) - int(reference))
+
 def device_info_rows(info_map):
     """Order device information for display/export."""
     return [(field, info_map.get(field, '')) for field in DEVICE_INFO_FIELDS]
 
-def build_device_info(conn, sdk_build=None):
-    """Collect device metadata from an active connection."""
+def build_device_info(conn, sdk_build=None, cache=None, fields=None):
+    """Collect device metadata from an active connection.
+
+    fields optionally limits the probes to a subset of DEVICE_INFO_FIELDS;
+    the device time is always read so drift can be computed. With a cache hit
+    only the volatile fields are probed and info['cached'] is True.
+    """
     info = {}
     info['SDK build=1'] = sdk_build if sdk_build is not None else conn.set_sdk_build_1()
-    info['ExtendFmt'] = conn.get_extend_fmt()
-    info['UsrExtFmt'] = conn.get_user_extend_fmt()
-    info['Face FunOn'] = conn.get_face_fun_on()
-    info['Face Version'] = conn.get_face_version()
-    info['Finger Version'] = conn.get_fp_version()
-    info['Old FW Compat'] = conn.get_compat_old_firmware()
-    net = conn.get_network_params()
-    info['IP Address'] = net.get('ip')
-    info['Subnet Mask'] = net.get('mask')
-    info['Gateway'] = net.get('gateway')
-    info['Device Time'] = conn.get_time()
-    info['Firmware Version'] = conn.get_firmware_version()
-    info['Platform'] = conn.get_platform()
-    info['Device Name'] = conn.get_device_name()
-    info['Pin Width'] = conn.get_pin_width()
-    info['Serial Number'] = conn.get_serialnumber()
-    info['MAC'] = conn.get_mac()
+    serial = None
+    cached = None
+    if cache is not None:
+        key = '{}:{}'.format(conn.helper.ip, conn.helper.port)
+        serial = conn.get_serialnumber()
+        cached = cache.get(key, serial)
+        if cached is not None:
+            info.update(cached)
+        info['cached'] = cached is not None
+    if serial is not None:
+        info['Serial Number'] = serial
+    for field, method in DEVICE_INFO_PROBES:
+        if field not in info and (fields is None or field in fields or field == 'Device Time'):
+            info[field] = getattr(conn, method)()
+    if fields is None or NETWORK_INFO_FIELDS.intersection(fields):
+        net = conn.get_network_params()
+        info['IP Address'] = net.get('ip')
+        info['Subnet Mask'] = net.get('mask')
+        info['Gateway'] = net.get('gateway')
+    if cache is not None and cached is None and fields is None:
+        cache.put(key, serial, info)
     return info
 
-def fetch_device_snapshot(device_entry, args):
+def read_device_snapshot(connection, cache=None, fields=None):
+    """Read device info with the device disabled, re-enabling it afterwards."""
+    sdk_build = connection.set_sdk_build_1()
+    connection.disable_device()
+    try:
+        info = build_device_info(connection, sdk_build, cache, fields)
+        info['drift_s'] = clock_drift(info.get('Device Time'))
+        return info
+    finally:
+        try:
+            connection.enable_device()
+        except Exception:
+            pass
+
+def fetch_device_snapshot(device_entry, args, cache=None, pool=None):
     """Connect to a single device and return its info map plus optional error."""
     ip = device_entry.get('ip') or device_entry.get('address')
     if not ip:
         return {}, 'missing ip'
-    port = device_entry.get('port', args.port)
-    password = device_entry.get('password', args.password)
-    conn_local = None
     try:
+        port = int(device_entry.get('port', args.port))
+    except (TypeError, ValueError):
+        return {}, 'invalid port: {!r}'.format(device_entry.get('port'))
+    password = device_entry.get('password', args.password)
+
+    def connect():
         zk_local = ZK(ip, port=port, timeout=args.timeout, password=password, force_udp=args.force_udp, verbose=args.verbose)
-        conn_local = zk_local.connect()
-        sdk_build = conn_local.set_sdk_build_1()
-        conn_local.disable_device()
-        info = build_device_info(conn_local, sdk_build)
-        return info, ''
+        return zk_local.connect()
+
+    try:
+        if pool is not None:
+            with pool.checkout((ip, port), connect) as conn_local:
+                return read_device_snapshot(conn_local, cache, args.fields), ''
+        conn_local = connect()
+        try:
+            return read_device_snapshot(conn_local, cache, args.fields), ''
+        finally:
+            conn_local.disconnect()
     except Exception as exc:
         return {}, str(exc)
-    finally:
-        if conn_local:
+
+def iter_devices(path):
+    """Yield device entries from a devices JSON file as they are parsed."""
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    with open(path, 'rb') as handle:
+        if handle.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+            handle.seek(0)
+        if ijson is None:
             try:
-                conn_local.enable_device()
-            except Exception:
-                pass
-            conn_local.disconnect()
+                from orjson import loads
+            except ImportError:
+                from json import loads
+            data = loads(handle.read())
+            devices = data.get('devices', data) if isinstance(data, dict) else data
+            if not isinstance(devices, list):
+                raise ValueError('devices.json must contain a list under "devices" or be a list itself')
+            for device in devices:
+                yield device
+            return
+        events = ijson.parse(handle)
+        first = next(events, None)
+        if first is None or first[1] not in ('start_array', 'start_map'):
+            raise ValueError('devices.json must contain a list under "devices" or be a list itself')
+        if first[1] == 'start_array':
+            for device in ijson.items(itertools.chain([first], events), 'item'):
+                yield device
+            return
+        found = []
+
+        def watch(stream):
+            # Note whether the root object's "devices" value is actually a list
+            for event in stream:
+                if event[0] == 'devices' and event[1] == 'start_array':
+                    found.append(True)
+                yield event
+
+        for device in ijson.items(watch(itertools.chain([first], events)), 'devices.item'):
+            yield device
+        if not found:
+            raise ValueError('devices.json must contain a list under "devices" or be a list itself')
 
-def export_devices_to_csv(args):
+def export_devices_to_csv(args, cache=None, pool=None):
     """Load devices from JSON and export their info to CSV."""
-    with open(args.devices_json, 'r', encoding='utf-8-sig') as handle:
-        data = json.load(handle)
-    devices = data.get('devices', data)
-    if not isinstance(devices, list):
-        raise ValueError('devices.json must contain a list under "devices" or be a list itself')
-    fieldnames = []
-    for device in devices:
-        for key in device.keys():
-            if key not in fieldnames:
-                fieldnames.append(key)
-    if 'error' not in fieldnames:
-        fieldnames.append('error')
-    for key in DEVICE_INFO_FIELDS:
-        if key not in fieldnames:
-            fieldnames.append(key)
+    import csv
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    devices = []
+    fieldnames = {}
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.bulk_workers)) as executor:
+        for idx, device in enumerate(iter_devices(args.devices_json)):
+            devices.append(device)
+            fieldnames.update(dict.fromkeys(device))
+            futures[executor.submit(fetch_device_snapshot, device, args, cache, pool)] = idx
+        snapshots = [None] * len(devices)
+        for future in as_completed(futures):
+            snapshots[futures[future]] = future.result()
+    for key in ['error'] + SNAPSHOT_FIELDS:
+        fieldnames.setdefault(key)
+    fieldnames = list(fieldnames)
     output_path = args.devices_csv or 'devices_export.csv'
-    with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for device in devices:
-            row = {key: device.get(key, '') for key in fieldnames}
-            info, error = fetch_device_snapshot(device, args)
+    row_builder = operator.itemgetter(*fieldnames)
+    blank_info = dict.fromkeys(SNAPSHOT_FIELDS, '')
+    with io.TextIOWrapper(open(output_path, 'wb', buffering=CSV_BUFFER_SIZE),
+                          encoding='utf-8-sig', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(fieldnames)
+        for device, (info, error) in zip(devices, snapshots):
+            row = dict.fromkeys(fieldnames, '')
+            row.update(device)
             row['error'] = error
-            for key in DEVICE_INFO_FIELDS:
-                row[key] = info.get(key, '') if info else ''
-            writer.writerow(row)
+            if info:
+                row.update((key, info.get(key, '')) for key in SNAPSHOT_FIELDS)
+            else:
+                row.update(blank_info)
+            writer.writerow(row_builder(row))
     print('Exported {} devices to {}'.format(len(devices), output_path))
 
 def print_feature_table(options):
@@ -232,6 +470,7 @@ def print_feature_table(options):
         ('Force UDP', '-f/--force-udp', on_off(options.force_udp), 'Force UDP transport'),
         ('Verbose', '-v/--verbose', on_off(options.verbose), 'Print debug info'),
         ('Templates', '-t/--templates', on_off(options.templates), 'Compare template reads'),
+        ('Verify Workers', '--verify-workers', 'ON ({})'.format(options.verify_workers), 'Connections for -t checks'),
         ('Templates Raw', '-tr/--templates-raw', on_off(options.templates_raw), 'Dump templates'),
         ('Templates Index', '-ti/--templates-index', on_off(options.templates_index, ' ({})'.format(options.templates_index) if options.templates_index else ''), 'Read single template'),
         ('Records', '-r/--records', on_off(options.records), 'Fetch attendance logs'),
@@ -240,13 +479,29 @@ def print_feature_table(options):
         ('Open Door', '-o/--open-door', on_off(options.open_door), 'Unlock once (10s)'),
         ('Open Door Continuous', '-oc/--open-door-continuous', on_off(options.open_door_continuous, ' ({}s)'.format(options.open_door_continuous) if options.open_door_continuous else ''), 'Keep unlocking'),
         ('Delete User', '-D/--deleteuser', on_off(options.deleteuser, ' (#%s)' % options.deleteuser if options.deleteuser else ''), 'Remove user by UID'),
+        ('Verify Delete', '--verify-delete', on_off(options.verify_delete), 'Re-read users after delete'),
         ('Add User', '-A/--adduser', on_off(options.adduser, ' (#%s)' % options.adduser if options.adduser else ''), 'Create/update user'),
         ('Enroll User', '-E/--enrolluser', on_off(options.enrolluser, ' (#%s)' % options.enrolluser if options.enrolluser else ''), 'Enroll fingerprint'),
         ('Devices JSON', '--devices-json', on_off(options.devices_json, ' ({})'.format(options.devices_json) if options.devices_json else ''), 'Bulk export source file'),
         ('Devices CSV', '--devices-csv', on_off(options.devices_csv, ' ({})'.format(options.devices_csv)), 'Bulk export destination'),
+        ('Bulk Workers', '--bulk-workers', 'ON ({})'.format(options.bulk_workers), 'Parallel bulk connections'),
+        ('Bulk Interval', '--bulk-interval', on_off(options.bulk_interval, ' ({}s)'.format(options.bulk_interval) if options.bulk_interval else ''), 'Repeat export on open connections'),
+        ('Info Fields', '--fields', on_off(options.fields, ' ({})'.format(len(options.fields)) if options.fields else ''), 'Limit device info probes'),
+        ('Snapshot Cache', '--no-cache/--cache-ttl', on_off(not options.no_cache, ' ({}s)'.format(options.cache_ttl) if options.cache_ttl else ''), 'Reuse stored device info'),
     ]
     render_table('Feature Configuration', ('Feature', 'Arguments', 'Enabled', 'Description'), rows)
 
+def open_snapshot_cache(options):
+    """Open the on-disk snapshot cache, or return None if disabled or unavailable."""
+    if options.no_cache:
+        return None
+    try:
+        return SnapshotCache(SNAPSHOT_CACHE_FILE, options.cache_ttl)
+    except Exception as exc:
+        # Read-only cwd or a dbm lock held by another run: carry on without caching
+        print('{} Snapshot cache disabled: {}'.format(STATUS_MARKERS['WARN'], exc))
+        return None
+
 parser = argparse.ArgumentParser(description='ZK Basic Reading Tests')
 parser.add_argument('-a', '--address', 
                     help='ZK device Address [192.168.1.130]', default='192.168.1.130')
@@ -264,6 +519,8 @@ parser.add_argument('-v', '--verbose', action="store_true",
                     help='Print debug information')
 parser.add_argument('-t', '--templates', action="store_true",
                     help='Get templates / fingers (compare bulk and single read)')
+parser.add_argument('--verify-workers', type=int, default=1,
+                    help='Device connections used to re-read templates with -t [1]')
 parser.add_argument('-tr', '--templates-raw', action="store_true",
                     help='Get raw templates (dump templates)')
 parser.add_argument('-ti', '--templates-index', type=int,
@@ -280,6 +537,8 @@ parser.add_argument('-oc', '--open-door-continuous', type=int, nargs='?', const=
                     help='Continuously open door; optionally set duration for each unlock (default 10s)')
 parser.add_argument('-D', '--deleteuser', type=int,
                     help='Delete a User (uid)', default=0)
+parser.add_argument('--verify-delete', action="store_true",
+                    help='Re-read users from the device after a delete')
 parser.add_argument('-A', '--adduser', type=int,
                     help='Add a User (uid) (and enroll)', default=0)
 parser.add_argument('-E', '--enrolluser', type=int,
@@ -290,8 +549,25 @@ parser.add_argument('--devices-json', default=None,
                     help='Path to a devices.json file for bulk export')
 parser.add_argument('--devices-csv', nargs='?', const='devices_export.csv', default=None,
                     help='Output CSV path for bulk export (defaults to devices_export.csv)')
+parser.add_argument('--bulk-workers', type=int, default=32,
+                    help='Max devices queried in parallel during bulk export [32]')
+parser.add_argument('--bulk-interval', type=int, default=0,
+                    help='Repeat the bulk export every N seconds, keeping device connections open (0: run once)')
+parser.add_argument('--fields', default=None,
+                    help='Comma separated device info fields to read (default: all)')
+parser.add_argument('--cache-ttl', type=int, default=86400,
+                    help='Seconds a cached device snapshot stays valid [86400] (0: no expiry)')
+parser.add_argument('--no-cache', action="store_true",
+                    help='Do not read or update the device snapshot cache')
 
 args = parser.parse_args()
+if args.fields:
+    args.fields = [field.strip() for field in args.fields.split(',') if field.strip()]
+    unknown = [field for field in args.fields if field not in DEVICE_INFO_FIELDS]
+    if unknown:
+        parser.error('unknown --fields: {} (choose from: {})'.format(', '.join(unknown), ', '.join(DEVICE_INFO_FIELDS)))
+else:
+    args.fields = None
 bulk_requested = bool(args.devices_json or args.devices_csv)
 if bulk_requested:
     if not args.devices_json:
@@ -306,10 +582,30 @@ if bulk_requested:
 
 print_feature_table(args)
 
+snapshot_cache = open_snapshot_cache(args)
+
 if bulk_requested:
-    export_devices_to_csv(args)
+    pool = None
+    if args.bulk_interval:
+        # keep every device open across passes: a connection sits idle for the sleep
+        # plus the rest of the pass, so allow two rounds of interval and timeout
+        pool = ConnectionPool(idle_timeout=2 * (args.bulk_interval + args.timeout))
+    try:
+        while True:
+            export_devices_to_csv(args, snapshot_cache, pool)
+            if not args.bulk_interval:
+                break
+            time.sleep(args.bulk_interval)
+    except KeyboardInterrupt:
+        print('Bulk export stopped')
+    finally:
+        if pool:
+            pool.close()
+        if snapshot_cache:
+            snapshot_cache.close()
     sys.exit(0)
 
+run = RunContext()
 zk = ZK(args.address, port=args.port, timeout=args.timeout, password=args.password, force_udp=args.force_udp, verbose=args.verbose)
 try:
     print('Connecting to device ...')
@@ -321,32 +617,40 @@ try:
     if args.updatetime:
         announce_section('Updating Time')
         conn.set_time(now)
-        add_result('Time Update', 'OK', 'Device time set to {}'.format(now))
-    device_info_map = build_device_info(conn, sdk_build)
+        run.add('Time Update', 'OK', 'Device time set to {}'.format(now))
+    device_info_map = build_device_info(conn, sdk_build, snapshot_cache, args.fields)
     zk_time = device_info_map.get('Device Time')
-    dif = abs(zk_time - now).total_seconds()
-    if dif > 120:
+    dif = clock_drift(zk_time, now)
+    if dif is not None and dif > 120:
         print("WRN: TIME IS NOT SYNC!!!!!! (local: %s) use command -u to update" % now)
-    add_result('Connection', 'OK', 'Connected to {}:{}'.format(args.address, args.port))
-    add_result('Time Drift', 'WARN' if dif > 120 else 'OK', '{}s difference'.format(int(dif)))
+    run.add('Connection', 'OK', 'Connected to {}:{}'.format(args.address, args.port))
+    if dif is None:
+        run.add('Time Drift', 'WARN', 'Device time unavailable')
+    else:
+        run.add('Time Drift', 'WARN' if dif > 120 else 'OK', '{}s difference'.format(dif))
+    if device_info_map.get('cached'):
+        run.add('Device Info', 'INFO', 'Replayed from snapshot cache (serial {})'.format(device_info_map.get('Serial Number')))
     render_keyvalue_table('Device Information', device_info_rows(device_info_map))
     render_sizes_table(conn, 'Sizes & Capacity (Before)')
     if args.basic:
-        add_result('Mode', 'INFO', 'Basic information only')
+        run.add('Mode', 'INFO', 'Basic information only')
         raise BasicException("Basic Info... Done!")
     announce_section('Load Users')
     inicio = time.time()
     users = conn.get_users()
     final = time.time()
     print ('    took {:.3f}[s]'.format(final - inicio))
-    add_result('Users', 'OK', 'Fetched {} users'.format(len(users)))
+    run.add('Users', 'OK', 'Fetched {} users'.format(len(users)))
     target_uid = args.adduser if args.adduser else None
     initial_rows, prev = collect_user_rows(users, target_uid)
     if args.deleteuser:
         announce_section('Delete User UID#{}'.format(args.deleteuser))
         conn.delete_user(args.deleteuser)
-        add_result('Delete User', 'OK', 'Removed UID {}'.format(args.deleteuser))
-        users = conn.get_users() #update
+        run.add('Delete User', 'OK', 'Removed UID {}'.format(args.deleteuser))
+        if args.verify_delete:
+            users = conn.get_users() #update
+        else:
+            users = [u for u in users if u.uid != args.deleteuser]
         user_rows, prev_after = collect_user_rows(users, target_uid)
         if prev is None:
             prev = prev_after
@@ -359,7 +663,7 @@ try:
         uid = int(args.adduser)
         if prev:
             user = prev
-            privilege = 'User' if user.privilege == const.USER_DEFAULT else 'Admin-%s' % user.privilege
+            privilege = privilege_label(user.privilege)
             announce_section('Modify User #{}'.format(user.uid))
             print ('-> UID #{:<5} Name     : {:<27} Privilege : {}'.format(user.uid, user.name, privilege))
             print ('              Group ID : {:<8} User ID : {:<8} Password  : {:<8} Card : {}'.format(user.group_id, user.user_id, user.password, user.card))
@@ -378,14 +682,14 @@ try:
         try:
             conn.set_user(uid, name, privilege, password, '', user_id, card)
             args.enrolluser = uid
-            add_result('Add User', 'OK', 'UID {}'.format(uid))
+            run.add('Add User', 'OK', 'UID {}'.format(uid))
         except ZKErrorResponse as e:
             print ("error: %s" % e)
             #try new format
             zk_user = User(uid, name, privilege, password, '', user_id, card)
             conn.save_user_template(zk_user)# forced creation
             args.enrolluser = uid
-            add_result('Add User', 'WARN', 'Forced template for UID {}'.format(uid))
+            run.add('Add User', 'WARN', 'Forced template for UID {}'.format(uid))
         conn.refresh_data()
 
     if args.enrolluser:
@@ -397,10 +701,10 @@ try:
             conn.test_voice(18) # register ok
             tem = conn.get_user_template(uid, args.finger)
             print (tem)
-            add_result('Enroll User', 'OK', 'UID {} finger {}'.format(uid, args.finger))
+            run.add('Enroll User', 'OK', 'UID {} finger {}'.format(uid, args.finger))
         else:
             conn.test_voice(23) # not registered
-            add_result('Enroll User', 'FAIL', 'UID {} finger {}'.format(uid, args.finger))
+            run.add('Enroll User', 'FAIL', 'UID {} finger {}'.format(uid, args.finger))
         conn.refresh_data()
     #print ("Voice Test ...")
     #conn.test_voice(10)
@@ -411,20 +715,17 @@ try:
         final = time.time()
         print ('    took {:.3f}[s]'.format(final - inicio))
         print (" single! {}".format(template))
-        add_result('Template Single', 'OK' if template else 'WARN', 'UID {} finger {}'.format(args.templates_index, args.finger))
+        run.add('Template Single', 'OK' if template else 'WARN', 'UID {} finger {}'.format(args.templates_index, args.finger))
     elif args.templates or args.templates_raw:
         print ("Read Templates...")
         inicio = time.time()
         templates = conn.get_templates()
         final = time.time()
         print ('    took {:.3f}[s]'.format(final - inicio))
-        add_result('Templates', 'OK', 'Fetched {} templates'.format(len(templates)))
+        run.add('Templates', 'OK', 'Fetched {} templates'.format(len(templates)))
         if args.templates:
             print ('now checking individually...')
-            i = 0
-            for tem in templates:
-                i += 1
-                tem2 =conn.get_user_template(tem.uid,tem.fid)
+            for i, (tem, tem2) in enumerate(verify_templates(conn, templates, args), 1):
                 if tem2 is None:
                     print ("%i: bulk! %s" % (i, tem))
                 elif tem == tem2: # compare with alternative method
@@ -447,18 +748,15 @@ try:
         attendance = conn.get_attendance()
         final = time.time()
         print ('    took {:.3f}[s]'.format(final - inicio))
-        add_result('Records', 'OK', 'Fetched {} events'.format(len(attendance)))
-        i = 0
-        for att in attendance:
-            i += 1
+        run.add('Records', 'OK', 'Fetched {} events'.format(len(attendance)))
+        for i, att in enumerate(attendance, 1):
             print ("ATT {:>6}: uid:{:>3}, user_id:{:>8} t: {}, s:{} p:{}".format(i, att.uid, att.user_id, att.timestamp, att.status, att.punch))
-        print ('    took {:.3f}[s]'.format(final - inicio))
     render_sizes_table(conn, 'Sizes & Capacity (After)')
     if args.open_door:
         announce_section('Open Door (10s)')
         conn.unlock(10)
         print ('    Door unlocked successfully')
-        add_result('Open Door', 'OK', 'Unlocked for 10s')
+        run.add('Open Door', 'OK', 'Unlocked for 10s')
     if args.open_door_continuous:
         duration = max(1, args.open_door_continuous)
         announce_section('Continuous Door Opening (Ctrl+C to stop)')
@@ -468,7 +766,7 @@ try:
                 time.sleep(duration)
         except KeyboardInterrupt:
             print ('    Continuous opening stopped')
-            add_result('Open Door Continuous', 'OK', 'Loop stopped, duration {}s'.format(duration))
+            run.add('Open Door Continuous', 'OK', 'Loop stopped, duration {}s'.format(duration))
     if args.live_capture:
         announce_section('Live Capture (Ctrl+C to stop)')
         counter = 0
@@ -484,21 +782,24 @@ try:
                 conn.end_live_capture = True
         print('')
         print(styled_title('Capture End'))
-        add_result('Live Capture', 'OK', '{} events captured'.format(captured_events))
+        run.add('Live Capture', 'OK', '{} events captured'.format(captured_events))
     print ('')
 except BasicException as e:
     print (e)
     print ('')
-    add_result('Run', 'INFO', str(e))
+    run.add('Run', 'INFO', str(e))
 except Exception as e:
     print ("Process terminate : {}".format(e))
     print ("Error: %s" % sys.exc_info()[0])
     print ('-'*60)
+    import traceback
     traceback.print_exc(file=sys.stdout)
     print ('-'*60)
-    add_result('Run', 'FAIL', str(e))
+    run.add('Run', 'FAIL', str(e))
 finally:
-    render_execution_results('Execution Results', results)
+    render_execution_results('Execution Results', run.results)
+    if snapshot_cache:
+        snapshot_cache.close()
     if conn:
         print ('\nEnabling device ...')
         conn.enable_device()
@@ -1,62 +1,268 @@
 
 from zk import ZK, const
+from zk.user import User
 import time
+import codecs
 import csv
+import enum
 import sqlite3
 import json
+import os
+import itertools
+import functools
+import sys
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from types import MappingProxyType
+
+try:
+    # Optional: faster whole-file decoding of devices.json
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# Privilege levels bound once (avoids const attribute lookups inside per-user loops)
+_ADMIN = const.USER_ADMIN
+_DEFAULT = const.USER_DEFAULT
+
+# Attendance status names indexed by status code (0..5)
+_STATUS = ("Check-In", "Check-Out", "Break-Out", "Break-In", "OT-In", "OT-Out")
+
+# Live capture: events buffered between the socket reader and the terminal renderer
+LIVE_BUFFER_SIZE = 10000
+LIVE_RENDER_INTERVAL = 0.25
+
+# Upper bound on devices contacted at once during "sync all" (each worker owns its own socket)
+SYNC_MAX_WORKERS = 32
+
+# Connection settings shared by every ZK instance: longer timeout and force_udp=True
+# (ZK Teco often uses UDP)
+_ZK_KW = dict(port=4370, timeout=30, password=0, force_udp=True)
+# Skip the pre-connect ping for devices that connected successfully this recently (seconds)
+ZK_PING_SKIP_WINDOW = 60
+
+# Interactive session connections kept open per device IP (least recently used evicted)
+CONN_POOL_SIZE = 8
+# Cached user lists older than this are refetched when switching back to a device
+CONN_POOL_USERS_TTL = 300
+
+# Minimum seconds between progress lines while saving attendance
+PROGRESS_INTERVAL = 1.0
+
+# Stay under SQLite's historical SQLITE_MAX_VARIABLE_NUMBER default (999) for multi-row VALUES
+SQLITE_MAX_VARIABLES = 999
+
+# Write buffer for CSV exports (fewer, larger write syscalls)
+CSV_BUFFER_SIZE = 1 << 20
+
+# Insert statements shared by every save call: (text before VALUES, text after VALUES).
+# Attendance duplicates are skipped through the targeted UNIQUE index when the SQLite
+# library supports upsert syntax (3.24+), otherwise through the generic OR IGNORE path
+if sqlite3.sqlite_version_info >= (3, 24, 0):
+    _ATT_INSERT_SQL = (
+        "INSERT INTO attendance (device_ip, uid, user_id, name, timestamp, status, punch)",
+        "ON CONFLICT(device_ip, user_id, timestamp) DO NOTHING",
+    )
+else:
+    _ATT_INSERT_SQL = ("INSERT OR IGNORE INTO attendance (device_ip, uid, user_id, name, timestamp, status, punch)", "")
+_USERS_UPSERT_SQL = ("INSERT OR REPLACE INTO users (device_ip, uid, name, privilege, password, group_id, user_id, card)", "")
+
+
+# One long-lived connection per database file, shared by all saves; _DB_LOCK serializes use
+_DB_CONNS = {}
+_DB_LOCK = threading.RLock()
+
+
+def connect_db(db_file="zkteco.db"):
+    """Open SQLite connection tuned for bulk writes (WAL + synchronous=NORMAL)"""
+    # isolation_level=None: no implicit BEGIN; every write path opens BEGIN IMMEDIATE itself
+    db_conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+    db_conn.execute("PRAGMA journal_mode = WAL")
+    db_conn.execute("PRAGMA synchronous = NORMAL")
+    db_conn.execute("PRAGMA temp_store = MEMORY")
+    db_conn.execute("PRAGMA cache_size = -200000")
+    db_conn.execute("PRAGMA mmap_size = 1073741824")
+    return db_conn
+
+
+def get_db(db_file="zkteco.db"):
+    """Return the shared connection for db_file, opening and configuring it on first use"""
+    with _DB_LOCK:
+        db_conn = _DB_CONNS.get(db_file)
+        if db_conn is None:
+            db_conn = _DB_CONNS[db_file] = connect_db(db_file)
+        return db_conn
+
+
+def close_db():
+    """Close all shared database connections"""
+    with _DB_LOCK:
+        for db_conn in _DB_CONNS.values():
+            db_conn.close()
+        _DB_CONNS.clear()
 
 
 def init_database(db_file="zkteco.db"):
     """Initialize SQLite database with attendance/users tables, including device_ip (keep old data)"""
     try:
-        db_conn = sqlite3.connect(db_file)
+        db_conn = get_db(db_file)
         cursor = db_conn.cursor()
 
-        # Only create tables if they do not exist, do not delete old data
-        # cursor.execute('DROP TABLE IF EXISTS attendance')  # Commented to keep data
-        # cursor.execute('DROP TABLE IF EXISTS users')       # Commented to keep data
-
-        # Attendance table includes device_ip, name, and unique constraint
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_ip TEXT NOT NULL,
-                uid INTEGER,
-                user_id TEXT NOT NULL,
-                name TEXT,
-                timestamp TIMESTAMP,
-                status INTEGER,
-                punch INTEGER,
-                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(device_ip, user_id, timestamp)
-            )
-        ''')
-
-        # Users table includes device_ip and unique constraint on (device_ip, uid)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                device_ip TEXT NOT NULL,
-                uid INTEGER,
-                name TEXT,
-                privilege TEXT,
-                password TEXT,
-                group_id TEXT,
-                user_id TEXT,
-                card TEXT,
-                synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(device_ip, uid)
-            )
-        ''')
+        # Connection context manager commits on success, rolls back on error
+        with _DB_LOCK, db_conn:
+            cursor.execute("BEGIN IMMEDIATE")
+
+            # Only create tables if they do not exist, do not delete old data
+            # cursor.execute('DROP TABLE IF EXISTS attendance')  # Commented to keep data
+            # cursor.execute('DROP TABLE IF EXISTS users')       # Commented to keep data
+
+            # Attendance table includes device_ip, name, and unique constraint
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attendance (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    device_ip TEXT NOT NULL,
+                    uid INTEGER,
+                    user_id TEXT NOT NULL,
+                    name TEXT,
+                    timestamp TIMESTAMP,
+                    status INTEGER,
+                    punch INTEGER,
+                    imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(device_ip, user_id, timestamp)
+                )
+            ''')
+
+            # Users table includes device_ip and unique constraint on (device_ip, uid)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    device_ip TEXT NOT NULL,
+                    uid INTEGER,
+                    name TEXT,
+                    privilege TEXT,
+                    password TEXT,
+                    group_id TEXT,
+                    user_id TEXT,
+                    card TEXT,
+                    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(device_ip, uid)
+                )
+            ''')
 
-        db_conn.commit()
-        db_conn.close()
         print(f"✓ Database initialized: {db_file}")
     except Exception as err:
         print(f"✗ Database initialization error: {err}")
 
 
+def analyze_table(table, db_file="zkteco.db"):
+    """Refresh planner statistics after a bulk load"""
+    # The UNIQUE constraints already index (device_ip, user_id, timestamp) and (device_ip, uid);
+    # keeping their stats current is what lets the planner use them for per-device lookups
+    try:
+        with _DB_LOCK:
+            get_db(db_file).execute(f"ANALYZE {table}")
+    except sqlite3.Error as err:
+        print(f"⚠️  ANALYZE {table} failed: {err}")
+
+
+@functools.lru_cache(maxsize=None)
+def _insert_statements(sql, columns):
+    # Build (rows per chunk, multi-row SQL, single-row SQL) once per statement; identical
+    # text also lets sqlite3's per-connection statement cache reuse the compiled statements
+    sql_prefix, sql_suffix = sql
+    row_marks = "(" + ", ".join(["?"] * columns) + ")"
+    chunk = max(1, SQLITE_MAX_VARIABLES // columns)
+    chunk_sql = f"{sql_prefix} VALUES {', '.join([row_marks] * chunk)} {sql_suffix}".rstrip()
+    single_sql = f"{sql_prefix} VALUES {row_marks} {sql_suffix}".rstrip()
+    return chunk, chunk_sql, single_sql
+
+
+def insert_many(cursor, sql, columns, rows):
+    """Insert rows using multi-row VALUES statements, single-row statement for the tail
+
+    Returns the number of rows actually written (rows skipped on conflict are not counted).
+    """
+    chunk, chunk_sql, single_sql = _insert_statements(sql, columns)
+    changes_before = cursor.connection.total_changes
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, chunk))
+        if len(batch) < chunk:
+            if batch:
+                cursor.executemany(single_sql, batch)
+            return cursor.connection.total_changes - changes_before
+        cursor.execute(chunk_sql, list(itertools.chain.from_iterable(batch)))
+
+
+def _card(user, _getattr=getattr):
+    # Card number as text, empty when the user has none
+    card = _getattr(user, 'card', None)
+    return str(card) if card else ""
+
+
+def build_users_dict(users):
+    """Map user_id and str(uid) to user name, storing a single key when they are equal"""
+    users_dict = {}
+    for user in users:
+        name = user.name or ""
+        uid_key = str(user.uid)
+        users_dict[uid_key] = name
+        if user.user_id != uid_key:
+            users_dict[user.user_id] = name
+    return users_dict
+
+
+def _load_users_dict_from_db(device_ip, db_file="zkteco.db"):
+    """Build the user_id/uid -> name map from users already synced for a device, {} if none"""
+    try:
+        with _DB_LOCK:
+            rows = get_db(db_file).execute(
+                "SELECT uid, user_id, name FROM users WHERE device_ip=?", (device_ip,)
+            ).fetchall()
+    except sqlite3.Error:
+        return {}
+
+    return build_users_dict(User(uid, name or "", _DEFAULT, user_id=user_id or "") for uid, user_id, name in rows)
+
+
+def _attendance_rows(attendances, device_ip, users_dict, stats):
+    """Yield attendance insert tuples, counting produced/skipped records in stats"""
+    get_name = users_dict.get
+    monotonic = time.monotonic
+    next_progress = monotonic() + PROGRESS_INTERVAL
+    for att in attendances:
+        # One guarded block per record: device records normally have every field,
+        # so the exception path (malformed record -> skipped) is the rare case
+        try:
+            user_id = str(att.user_id or '').strip()
+            timestamp = att.timestamp
+            uid = int(att.uid or 0)
+            status = int(att.status or 0)
+            punch = int(att.punch or 0)
+        except (AttributeError, ValueError, TypeError):
+            stats["skipped"] += 1
+            continue
+        if not user_id or timestamp is None:
+            stats["skipped"] += 1
+            continue
+        stats["rows"] += 1
+        # Time-throttled progress (clock read every 1024 rows): at most one line per PROGRESS_INTERVAL
+        if not stats["rows"] & 1023 and monotonic() >= next_progress:
+            print(f"Progress: {stats['rows']} records saved...")
+            next_progress = monotonic() + PROGRESS_INTERVAL
+        yield (
+            device_ip,
+            uid,
+            user_id,
+            get_name(user_id) or get_name(str(uid)) or "",
+            str(timestamp).strip(),
+            status,
+            punch,
+        )
+
+
 def save_attendance_to_db(attendances, device_ip, users_dict, db_file="zkteco.db"):
     """Save attendance records into SQLite, optimized speed, include name from users"""
     if not attendances:
@@ -65,90 +271,36 @@ def save_attendance_to_db(attendances, device_ip, users_dict, db_file="zkteco.db
 
     try:
         print(f"Connecting to database {db_file}...")
-        db_conn = sqlite3.connect(db_file)
-        db_conn.isolation_level = None
-        db_conn.execute("PRAGMA synchronous = OFF")
-        db_conn.execute("PRAGMA cache_size = 50000")
-        db_conn.execute("PRAGMA temp_store = MEMORY")
+        db_conn = get_db(db_file)
         cursor = db_conn.cursor()
 
+        stats = {"rows": 0, "skipped": 0}
         inserted = 0
         errors = 0
-        skipped = 0
 
         print(f"Starting to process {len(attendances)} records...\n")
 
-        batch = []
-
-        for idx, att in enumerate(attendances):
-            try:
-                if not hasattr(att, 'user_id') or not hasattr(att, 'timestamp'):
-                    skipped += 1
-                    continue
-
-                try:
-                    uid = int(getattr(att, 'uid', 0))
-                except (ValueError, TypeError):
-                    uid = 0
-
-                user_id = str(att.user_id).strip()
-                timestamp = str(att.timestamp).strip()
-
-                try:
-                    status = int(getattr(att, 'status', 0))
-                except (ValueError, TypeError):
-                    status = 0
-
-                try:
-                    punch = int(getattr(att, 'punch', 0))
-                except (ValueError, TypeError):
-                    punch = 0
-
-                if not user_id:
-                    skipped += 1
-                    continue
-
-                # Get name from users_dict (uid/user_id -> name mapping)
-                name = users_dict.get(str(uid), "") or users_dict.get(user_id, "")
-
-                batch.append((device_ip, uid, user_id, name, timestamp, status, punch))
-
-                if len(batch) >= 1000:
-                    try:
-                        cursor.executemany('''
-                            INSERT OR IGNORE INTO attendance (device_ip, uid, user_id, name, timestamp, status, punch)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ''', batch)
-                        inserted += len(batch)
-                        print(f"Progress: {inserted} records saved...")
-                    except Exception as e:
-                        errors += len(batch)
-                        if errors <= 3:
-                            print(f"⚠️  Batch error: {e}")
-                    batch = []
-
-            except Exception as e:
-                errors += 1
-                if errors <= 3:
-                    print(f"⚠️  Record error {idx}: {type(e).__name__}: {str(e)[:100]}")
-                continue
-
-        if batch:
-            try:
-                cursor.executemany('''
-                    INSERT OR IGNORE INTO attendance (device_ip, uid, user_id, name, timestamp, status, punch)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', batch)
-                inserted += len(batch)
-            except Exception as e:
-                errors += len(batch)
-
-        db_conn.commit()
-        db_conn.execute("PRAGMA synchronous = FULL")
-        db_conn.close()
+        # Single write transaction for the whole load: one journal sync instead of one per batch.
+        # The connection context manager commits on success and rolls back on error.
+        try:
+            with _DB_LOCK, db_conn:
+                cursor.execute("BEGIN IMMEDIATE")
+                inserted = insert_many(
+                    cursor,
+                    _ATT_INSERT_SQL,
+                    7,
+                    _attendance_rows(attendances, device_ip, users_dict, stats),
+                )
+        except Exception as e:
+            inserted = 0
+            errors = stats["rows"]
+            print(f"⚠️  Batch error: {e}")
+        duplicates = 0 if errors else stats["rows"] - inserted
+        skipped = stats["skipped"]
 
         print(f"\n✓ Database save completed:")
         print(f"  - New records: {inserted}")
+        print(f"  - Already in database: {duplicates}")
         print(f"  - Skipped records: {skipped}")
         print(f"  - Errors: {errors}")
 
@@ -158,57 +310,85 @@ def save_attendance_to_db(attendances, device_ip, users_dict, db_file="zkteco.db
         traceback.print_exc()
 
 
-def save_users_to_db(users, device_ip, db_file="zkteco.db"):
-    """Save users list into SQLite including device_ip, optimized speed"""
+def _user_db_rows(users, device_ip):
+    """Build users-table rows (device_ip first) for one device, skipping unreadable users"""
+    rows = []
+    for user in users:
+        try:
+            privilege = "Admin" if user.privilege == _ADMIN else "User"
+            uid = user.uid
+            name = user.name or ""
+            password = user.password or ""
+            group_id = user.group_id or ""
+            user_id = user.user_id or ""
+            card = _card(user)
+
+            rows.append((device_ip, uid, name, privilege, password, group_id, user_id, card))
+        except Exception:
+            continue
+    return rows
+
+
+def save_user_rows_to_db(rows, db_file="zkteco.db"):
+    """Upsert prepared users-table rows (any number of devices) in one transaction"""
     try:
-        db_conn = sqlite3.connect(db_file)
-        db_conn.execute("PRAGMA synchronous = OFF")  # Disable sync
-        db_conn.execute("PRAGMA cache_size = 50000")
+        db_conn = get_db(db_file)
         cursor = db_conn.cursor()
 
-        # Batch insert
-        batch = []
-        for user in users:
-            try:
-                privilege = "Admin" if user.privilege == const.USER_ADMIN else "User"
-                uid = user.uid
-                name = user.name or ""
-                password = user.password or ""
-                group_id = user.group_id or ""
-                user_id = user.user_id or ""
-                card = str(user.card) if hasattr(user, 'card') and user.card else ""
-
-                batch.append((device_ip, uid, name, privilege, password, group_id, user_id, card))
-            except Exception:
-                continue
-
-        # Bulk insert
-        cursor.executemany('''
-            INSERT OR REPLACE INTO users (device_ip, uid, name, privilege, password, group_id, user_id, card)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', batch)
-
-        db_conn.commit()
-        db_conn.execute("PRAGMA synchronous = FULL")
-        db_conn.close()
-
-        print(f"✓ Users saved: {len(batch)} records")
+        # Bulk insert in one transaction (committed by the context manager)
+        with _DB_LOCK, db_conn:
+            cursor.execute("BEGIN IMMEDIATE")
+            insert_many(
+                cursor,
+                _USERS_UPSERT_SQL,
+                8,
+                rows,
+            )
+
+        print(f"✓ Users saved: {len(rows)} records")
     except Exception as err:
         print(f"✗ Error saving users: {err}")
 
 
+def save_users_to_db(users, device_ip, db_file="zkteco.db"):
+    """Save users list into SQLite including device_ip, optimized speed"""
+    save_user_rows_to_db(_user_db_rows(users, device_ip), db_file)
+
+
+def _column_widths(headers, rows):
+    # Single in-place pass over already-stringified rows
+    widths = [len(h) for h in headers]
+    for row in rows:
+        for i, col in enumerate(row):
+            length = len(col)
+            if length > widths[i]:
+                widths[i] = length
+    return widths
+
+
+def _write_table(headers, rows):
+    """Write headers/rows (lists of str) as an ASCII table with a single stdout write"""
+    widths = _column_widths(headers, rows)
+    # One format template per table instead of a zip/ljust per row
+    row_format = " | ".join(f"{{:<{w}}}" for w in widths).format
+    lines = ["", row_format(*headers), "-+-".join("-" * w for w in widths)]
+    lines.extend(row_format(*row) for row in rows)
+    lines.append("\n")
+    sys.stdout.write("\n".join(lines))
+
+
 def print_users_table(users):
     # Render a simple ASCII table for user info
     headers = ["UID", "Name", "Privilege", "Password", "Group ID", "User ID", "Card"]
     rows = []
     for user in users:
-        privilege = "Admin" if user.privilege == const.USER_ADMIN else "User"
-        card = str(user.card) if hasattr(user, 'card') and user.card else ""
+        privilege = "Admin" if user.privilege == _ADMIN else "User"
+        card = _card(user)
         rows.append([
             str(user.uid),
-            user.name or "",
+            str(user.name or ""),
             privilege,
-            user.password or "",
+            str(user.password or ""),
             str(user.group_id),
             str(user.user_id),
             card,
@@ -218,56 +398,52 @@ def print_users_table(users):
         print("No data to display.")
         return
 
-    # Compute column widths
-    widths = [len(h) for h in headers]
-    for row in rows:
-        widths = [max(w, len(str(col))) for w, col in zip(widths, row)]
+    _write_table(headers, rows)
 
-    def fmt_row(row_values):
-        return " | ".join(str(col).ljust(w) for col, w in zip(row_values, widths))
 
-    # Build separator line
-    separator = "-+-".join("-" * w for w in widths)
+def _user_csv_rows(users, _admin=_ADMIN):
+    # CSV row tuples for export_users_csv
+    for user in users:
+        yield (
+            user.uid,
+            user.name or "",
+            "Admin" if user.privilege == _admin else "User",
+            user.password or "",
+            user.group_id,
+            user.user_id,
+            _card(user),
+        )
 
-    print()
-    print(fmt_row(headers))
-    print(separator)
-    for row in rows:
-        print(fmt_row(row))
-    print()
+
+@functools.lru_cache(maxsize=256)
+def _ip_safe(device_ip):
+    # Device IP as a filename fragment
+    return device_ip.replace(".", "_")
 
 
 def export_users_csv(users, device_ip="unknown", filepath=None):
     # Export user list to CSV with device_ip and timestamp in filename
     if filepath is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        ip_safe = device_ip.replace(".", "_")
-        filepath = f"Output/users_export_{ip_safe}_{timestamp}.csv"
+        filepath = f"Output/users_export_{_ip_safe(device_ip)}_{timestamp}.csv"
 
     headers = ["UID", "Name", "Privilege", "Password", "Group ID", "User ID", "Card"]
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
+    with open(filepath, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE) as f:
         writer = csv.writer(f)
         writer.writerow(headers)
-        for user in users:
-            privilege = "Admin" if user.privilege == const.USER_ADMIN else "User"
-            card = str(user.card) if hasattr(user, 'card') and user.card else ""
-            writer.writerow([
-                user.uid,
-                user.name or "",
-                privilege,
-                user.password or "",
-                user.group_id,
-                user.user_id,
-                card,
-            ])
+        writer.writerows(_user_csv_rows(users))
     print(f"CSV exported: {filepath}")
 
 
 def load_devices(filepath="devices.json"):
     """Load the list of attendance devices from JSON file"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        # Decode from bytes in one call; tolerate a UTF-8 BOM left by Windows editors
+        if raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        data = _json_loads(raw)
         return data.get('devices', [])
     except FileNotFoundError:
         print(f"File not found: {filepath}")
@@ -277,6 +453,32 @@ def load_devices(filepath="devices.json"):
         return []
 
 
+def index_devices(devices):
+    """Map device IP -> device entry for O(1) lookups"""
+    return {device.get('ip'): device for device in devices}
+
+
+# filepath -> (mtime_ns, devices tuple, read-only devices_by_ip)
+_devices_cache = {}
+
+
+def get_devices(filepath="devices.json"):
+    """Return (devices, devices_by_ip), re-reading the JSON file only when its mtime changes"""
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+    except OSError:
+        mtime = None
+    cached = _devices_cache.get(filepath)
+    # A missing file is cached too (mtime None), so the "File not found" notice prints once
+    if cached is not None and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    devices = tuple(load_devices(filepath))
+    devices_by_ip = MappingProxyType(index_devices(devices))
+    _devices_cache[filepath] = (mtime, devices, devices_by_ip)
+    return devices, devices_by_ip
+
+
 def display_devices(devices):
     """Display the list of attendance devices in a table"""
     if not devices:
@@ -289,29 +491,16 @@ def display_devices(devices):
     for idx, device in enumerate(devices, 1):
         rows.append([
             str(idx),
-            device.get('ip', 'N/A'),
-            device.get('name', 'N/A'),
-            device.get('location', 'N/A'),
-            device.get('status', 'N/A'),
-            device.get('date_installed', 'N/A'),
-            device.get('date_expired', 'N/A'),
-            device.get('notes', 'N/A'),
+            str(device.get('ip', 'N/A')),
+            str(device.get('name', 'N/A')),
+            str(device.get('location', 'N/A')),
+            str(device.get('status', 'N/A')),
+            str(device.get('date_installed', 'N/A')),
+            str(device.get('date_expired', 'N/A')),
+            str(device.get('notes', 'N/A')),
         ])
 
-    widths = [len(h) for h in headers]
-    for row in rows:
-        widths = [max(w, len(str(col))) for w, col in zip(widths, row)]
-
-    def fmt_row(row_values):
-        return " | ".join(str(col).ljust(w) for col, w in zip(row_values, widths))
-
-    separator = "-+-".join("-" * w for w in widths)
-    print()
-    print(fmt_row(headers))
-    print(separator)
-    for row in rows:
-        print(fmt_row(row))
-    print()
+    _write_table(headers, rows)
 
 
 def select_device(devices):
@@ -338,45 +527,109 @@ def select_device(devices):
             print("Please enter a number or 'q'.")
 
 
+# device_ip -> time.monotonic() of the last successful connect
+_last_connect_ok = {}
+
+
+def connect_device(device_ip):
+    """Connect to a device, skipping the ping probe if it answered within ZK_PING_SKIP_WINDOW"""
+    last_ok = _last_connect_ok.get(device_ip)
+    recently_ok = last_ok is not None and time.monotonic() - last_ok < ZK_PING_SKIP_WINDOW
+    conn = ZK(device_ip, ommit_ping=recently_ok, **_ZK_KW).connect()
+    _last_connect_ok[device_ip] = time.monotonic()
+    return conn
+
+
+def _fetch_device_users(device):
+    """Connect to one device and return its users (runs in a worker thread)"""
+    conn = connect_device(device.get('ip'))
+    try:
+        conn.disable_device()
+        try:
+            return conn.get_users()
+        finally:
+            conn.enable_device()
+    finally:
+        conn.disconnect()
+
+
+def _fetch_device_attendance(device, known_names=None):
+    """Connect to one device and return (users, attendances) (runs in a worker thread)
+
+    users is None when known_names (from the database) already covers every record.
+    """
+    conn = connect_device(device.get('ip'))
+    try:
+        conn.disable_device()
+        try:
+            attendances = conn.get_attendance()
+            users = None
+            # Download users on the same session only when some record has no known name
+            # (e.g. enrolled after the last user sync), so no row is stored without one
+            if not known_names or any(
+                str(att.user_id).strip() not in known_names and str(att.uid) not in known_names
+                for att in attendances
+            ):
+                users = conn.get_users()
+            return users, attendances
+        finally:
+            conn.enable_device()
+    finally:
+        conn.disconnect()
+
+
+def _fetch_all_devices(devices, fetch):
+    """Run fetch(device) for all devices in parallel, yield (idx, device, result, error) as they finish"""
+    if not devices:
+        return
+    # Device I/O is network-bound; SQLite writes stay on the calling thread (single writer)
+    with ThreadPoolExecutor(max_workers=min(SYNC_MAX_WORKERS, len(devices))) as executor:
+        futures = {executor.submit(fetch, device): idx for idx, device in enumerate(devices, 1)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                yield idx, devices[idx - 1], future.result(), None
+            except Exception as e:
+                yield idx, devices[idx - 1], None, e
+
+
 def sync_all_devices_users(devices, db_file="zkteco.db"):
-    """Fetch users from all attendance devices and save to database"""
+    """Fetch users from all attendance devices and save to database, return {device_ip: users}"""
     print("\n" + "="*60)
     print("SYNC USERS FROM ALL ATTENDANCE DEVICES")
     print("="*60)
+    print(f"Connecting to {len(devices)} devices in parallel...")
 
     total_users = 0
     success_count = 0
     failed_devices = []
+    users_by_ip = {}
+    # Rows from every device, written in a single transaction once all fetches finish
+    user_rows = []
 
-    for idx, device in enumerate(devices, 1):
+    for idx, device, users, error in _fetch_all_devices(devices, _fetch_device_users):
         device_ip = device.get('ip')
         device_name = device.get('name', 'N/A')
 
-        print(f"\n[{idx}/{len(devices)}] Connecting to {device_name} ({device_ip})...")
-
-        try:
-            zk = ZK(device_ip, port=4370, timeout=30, password=0, force_udp=True, ommit_ping=False)
-            conn = zk.connect()
-            conn.disable_device()
-
-            print(f"  → Fetching users...")
-            users = conn.get_users()
-            print(f"  → Found {len(users)} users")
-
-            if users:
-                save_users_to_db(users, device_ip, db_file)
-                total_users += len(users)
-                success_count += 1
-
-            conn.enable_device()
-            conn.disconnect()
-            print(f"  ✓ Done!")
-
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
+        print(f"\n[{idx}/{len(devices)}] {device_name} ({device_ip})")
+        if error is not None:
+            print(f"  ✗ Error: {error}")
             failed_devices.append(f"{device_name} ({device_ip})")
             continue
 
+        print(f"  → Found {len(users)} users")
+        users_by_ip[device_ip] = users
+        if users:
+            user_rows.extend(_user_db_rows(users, device_ip))
+            total_users += len(users)
+            success_count += 1
+        print(f"  ✓ Done!")
+
+    if user_rows:
+        print()
+        save_user_rows_to_db(user_rows, db_file)
+        analyze_table("users", db_file)
+
     print("\n" + "="*60)
     print("USER SYNC RESULTS")
     print("="*60)
@@ -387,6 +640,7 @@ def sync_all_devices_users(devices, db_file="zkteco.db"):
         for dev in failed_devices:
             print(f"  - {dev}")
     print("="*60 + "\n")
+    return users_by_ip
 
 
 def sync_all_devices_attendance(devices, db_file="zkteco.db"):
@@ -394,47 +648,46 @@ def sync_all_devices_attendance(devices, db_file="zkteco.db"):
     print("\n" + "="*60)
     print("SYNC ATTENDANCE FROM ALL ATTENDANCE DEVICES")
     print("="*60)
+    print(f"Connecting to {len(devices)} devices in parallel...")
 
     total_records = 0
     success_count = 0
     failed_devices = []
 
-    for idx, device in enumerate(devices, 1):
+    # Names from a previous user sync save one users download per device
+    known_users = {device.get('ip'): _load_users_dict_from_db(device.get('ip'), db_file) for device in devices}
+
+    def fetch(device):
+        return _fetch_device_attendance(device, known_users[device.get('ip')])
+
+    for idx, device, result, error in _fetch_all_devices(devices, fetch):
         device_ip = device.get('ip')
         device_name = device.get('name', 'N/A')
 
-        print(f"\n[{idx}/{len(devices)}] Connecting to {device_name} ({device_ip})...")
+        print(f"\n[{idx}/{len(devices)}] {device_name} ({device_ip})")
+        if error is not None:
+            print(f"  ✗ Error: {error}")
+            failed_devices.append(f"{device_name} ({device_ip})")
+            continue
 
-        try:
-            zk = ZK(device_ip, port=4370, timeout=30, password=0, force_udp=True, ommit_ping=False)
-            conn = zk.connect()
-            conn.disable_device()
-
-            # Fetch users first for name mapping
-            print(f"  → Fetching users...")
-            users = conn.get_users()
-            users_dict = {}
-            for user in users:
-                users_dict[str(user.uid)] = user.name or ""
-                users_dict[user.user_id] = user.name or ""
-
-            print(f"  → Fetching attendance logs...")
-            attendances = conn.get_attendance()
-            print(f"  → Found {len(attendances)} records")
+        users, attendances = result
+        if users is None:
+            users_dict = known_users[device_ip]
+        else:
+            users_dict = build_users_dict(users)
+            if users:
+                # Persist so the next attendance sync can skip the users download
+                save_users_to_db(users, device_ip, db_file)
 
-            if attendances:
-                save_attendance_to_db(attendances, device_ip, users_dict, db_file)
-                total_records += len(attendances)
-                success_count += 1
+        print(f"  → Found {len(attendances)} records")
+        if attendances:
+            save_attendance_to_db(attendances, device_ip, users_dict, db_file)
+            total_records += len(attendances)
+            success_count += 1
+        print(f"  ✓ Done!")
 
-            conn.enable_device()
-            conn.disconnect()
-            print(f"  ✓ Done!")
-
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
-            failed_devices.append(f"{device_name} ({device_ip})")
-            continue
+    if total_records:
+        analyze_table("attendance", db_file)
 
     print("\n" + "="*60)
     print("ATTENDANCE SYNC RESULTS")
@@ -448,35 +701,172 @@ def sync_all_devices_attendance(devices, db_file="zkteco.db"):
     print("="*60 + "\n")
 
 
-def show_device_info(devices, device_ip):
+# device_ip -> [conn, users, users_fetched_at]; most recently used last
+CONN_POOL = OrderedDict()
+
+
+def get_conn(device_ip):
+    """Return (conn, cached users or None) for device_ip, reusing a live pooled connection"""
+    entry = CONN_POOL.pop(device_ip, None)
+    if entry is not None:
+        conn, users, fetched_at = entry
+        try:
+            # Cheap round-trip to make sure the device still honours the session
+            conn.get_time()
+        except Exception:
+            _disconnect_quietly(conn)
+            # Session went stale: probe with ping again on the reconnect
+            _last_connect_ok.pop(device_ip, None)
+        else:
+            CONN_POOL[device_ip] = entry
+            if users is not None and time.monotonic() - fetched_at < CONN_POOL_USERS_TTL:
+                return conn, users
+            return conn, None
+
+    conn = connect_device(device_ip)
+    CONN_POOL[device_ip] = [conn, None, 0.0]
+    while len(CONN_POOL) > CONN_POOL_SIZE:
+        _, (old_conn, _, _) = CONN_POOL.popitem(last=False)
+        _disconnect_quietly(old_conn)
+    return conn, None
+
+
+def cache_pool_users(device_ip, users):
+    """Remember the users list of a pooled connection for the next switch back"""
+    entry = CONN_POOL.get(device_ip)
+    if entry is not None:
+        entry[1] = users
+        entry[2] = time.monotonic()
+
+
+def drop_conn(device_ip):
+    """Disconnect and forget the pooled connection for device_ip"""
+    entry = CONN_POOL.pop(device_ip, None)
+    if entry is not None:
+        _disconnect_quietly(entry[0])
+    _last_connect_ok.pop(device_ip, None)
+
+
+def close_conn_pool():
+    """Disconnect every pooled device connection"""
+    while CONN_POOL:
+        _, (conn, _, _) = CONN_POOL.popitem()
+        _disconnect_quietly(conn)
+
+
+def _open_session(conn):
+    # Disable the device and download its users (run on the device I/O thread)
+    conn.disable_device()
+    return conn.get_users()
+
+
+def _close_session(conn):
+    # Thank-you voice, then re-enable the device (run on the device I/O thread)
+    conn.test_voice()
+    conn.enable_device()
+
+
+def _disconnect_quietly(conn):
+    try:
+        conn.disconnect()
+    except Exception:
+        pass
+
+
+def show_device_info(devices_by_ip, device_ip):
     """Show detailed information for a device in a table"""
-    for device in devices:
-        if device.get('ip') == device_ip:
-            info_rows = [
-                ["IP", device.get('ip', 'N/A')],
-                ["Device Name", device.get('name', 'N/A')],
-                ["Location", device.get('location', 'N/A')],
-                ["Status", device.get('status', 'N/A')],
-                ["Install Date", device.get('date_installed', 'N/A')],
-                ["Expiry Date", device.get('date_expired', 'N/A')],
-                ["Notes", device.get('notes', 'N/A')],
-            ]
-
-            widths = [len("Field"), len("Value")]
-            for row in info_rows:
-                widths = [max(widths[0], len(row[0])), max(widths[1], len(row[1]))]
-
-            def fmt_row(row_values):
-                return " | ".join(col.ljust(w) for col, w in zip(row_values, widths))
-
-            print("\n" + "="*(sum(widths) + 3))
-            print(fmt_row(["Field", "Value"]))
-            print("-"*(sum(widths) + 3))
-            for row in info_rows:
-                print(fmt_row(row))
-            print("="*(sum(widths) + 3) + "\n")
-            return
-    print(f"Device info not found for {device_ip}\n")
+    device = devices_by_ip.get(device_ip)
+    if device is None:
+        print(f"Device info not found for {device_ip}\n")
+        return
+
+    info_rows = [
+        ["IP", device.get('ip', 'N/A')],
+        ["Device Name", device.get('name', 'N/A')],
+        ["Location", device.get('location', 'N/A')],
+        ["Status", device.get('status', 'N/A')],
+        ["Install Date", device.get('date_installed', 'N/A')],
+        ["Expiry Date", device.get('date_expired', 'N/A')],
+        ["Notes", device.get('notes', 'N/A')],
+    ]
+
+    widths = [len("Field"), len("Value")]
+    for row in info_rows:
+        widths = [max(widths[0], len(row[0])), max(widths[1], len(row[1]))]
+
+    def fmt_row(row_values):
+        return " | ".join(col.ljust(w) for col, w in zip(row_values, widths))
+
+    print("\n" + "="*(sum(widths) + 3))
+    print(fmt_row(["Field", "Value"]))
+    print("-"*(sum(widths) + 3))
+    for row in info_rows:
+        print(fmt_row(row))
+    print("="*(sum(widths) + 3) + "\n")
+
+
+class UserIndex(list):
+    """Users list carrying lookup indexes, kept in step by upsert/remove_uid"""
+
+    def __init__(self, users=()):
+        super().__init__(users)
+        self.by_uid = {}
+        self.by_user_id = {}
+        # (casefolded name, user) in list order, for keyword search without per-query lower()
+        self.names = []
+        for user in self:
+            self._index(user)
+            self.names.append(((user.name or "").casefold(), user))
+
+    @classmethod
+    def of(cls, users):
+        """Return users as a UserIndex, without copying if it already is one"""
+        return users if isinstance(users, cls) else cls(users)
+
+    def _index(self, user):
+        self.by_uid[user.uid] = user
+        self.by_user_id.setdefault(str(user.user_id), []).append(user)
+
+    def _unindex(self, user):
+        del self.by_uid[user.uid]
+        same_id = self.by_user_id[str(user.user_id)]
+        same_id.remove(user)
+        if not same_id:
+            del self.by_user_id[str(user.user_id)]
+
+    def upsert(self, user):
+        """Replace the user with the same uid in place, or append a new one"""
+        old = self.by_uid.get(user.uid)
+        if old is None:
+            self.append(user)
+            self.names.append(((user.name or "").casefold(), user))
+        else:
+            pos = self.index(old)
+            self._unindex(old)
+            self[pos] = user
+            self.names[pos] = ((user.name or "").casefold(), user)
+        self._index(user)
+
+    def remove_uid(self, uid):
+        """Drop the user with this uid, if present"""
+        old = self.by_uid.get(uid)
+        if old is not None:
+            pos = self.index(old)
+            self._unindex(old)
+            del self[pos]
+            del self.names[pos]
+
+
+def _by_uid(users):
+    """Return the {uid: user} index for users"""
+    return UserIndex.of(users).by_uid
+
+
+def _upsert_user(users, user):
+    """Put user into the users index (replacing the same uid), return the index"""
+    users = UserIndex.of(users)
+    users.upsert(user)
+    return users
 
 
 def search_user_by_id(users):
@@ -485,7 +875,7 @@ def search_user_by_id(users):
     if not query:
         print("Search skipped.")
         return
-    matched = [u for u in users if str(u.user_id) == query]
+    matched = UserIndex.of(users).by_user_id.get(query, [])
     if matched:
         print(f"Found {len(matched)} result(s) with User ID = {query}:")
         print_users_table(matched)
@@ -500,8 +890,9 @@ def search_user_by_name(users):
         print("Search skipped.")
         return
 
-    query_lower = query.lower()
-    matched = [u for u in users if query_lower in (u.name or "").lower()]
+    # Keyword (substring) match needs a scan, but over pre-casefolded names
+    query_ci = query.casefold()
+    matched = [u for name_ci, u in UserIndex.of(users).names if query_ci in name_ci]
 
     if matched:
         print(f"\nFound {len(matched)} result(s) containing '{query}':")
@@ -512,7 +903,7 @@ def search_user_by_name(users):
 
 def search_user_admin(users):
     """List all users whose privilege is Admin"""
-    admin_users = [u for u in users if u.privilege == const.USER_ADMIN]
+    admin_users = [u for u in users if u.privilege == _ADMIN]
 
     if admin_users:
         print(f"\nFound {len(admin_users)} Admin account(s):")
@@ -521,10 +912,18 @@ def search_user_admin(users):
         print("No Admin accounts found in the list.")
 
 
+def _status_label(code):
+    # Status name for a status code, the raw code for unknown values, '' when missing
+    if code is None:
+        return ''
+    if isinstance(code, int) and 0 <= code < len(_STATUS):
+        return _STATUS[code]
+    return str(code)
+
+
 def print_attendance_table(attendances):
     # Render attendance records as ASCII table
     headers = ["UID", "User ID", "Timestamp", "Status", "Punch"]
-    status_map = {0: "Check-In", 1: "Check-Out", 2: "Break-Out", 3: "Break-In", 4: "OT-In", 5: "OT-Out"}
 
     rows = []
     for att in attendances:
@@ -532,8 +931,7 @@ def print_attendance_table(attendances):
             uid = str(getattr(att, 'uid', ''))
             user_id = str(getattr(att, 'user_id', ''))
             timestamp = str(getattr(att, 'timestamp', ''))
-            status_code = getattr(att, 'status', None)
-            status = status_map.get(status_code, str(status_code)) if status_code is not None else ''
+            status = _status_label(getattr(att, 'status', None))
             punch = str(getattr(att, 'punch', ''))
 
             rows.append([uid, user_id, timestamp, status, punch])
@@ -544,21 +942,7 @@ def print_attendance_table(attendances):
         print("No data to display.")
         return
 
-    widths = [len(h) for h in headers]
-    for row in rows:
-        widths = [max(w, len(str(col))) for w, col in zip(widths, row)]
-
-    def fmt_row(row_values):
-        return " | ".join(str(col).ljust(w) for col, w in zip(row_values, widths))
-
-    separator = "-+-".join("-" * w for w in widths)
-
-    print()
-    print(fmt_row(headers))
-    print(separator)
-    for row in rows:
-        print(fmt_row(row))
-    print()
+    _write_table(headers, rows)
 
 
 def get_attendance_interactive(conn, device_ip, users):
@@ -575,10 +959,7 @@ def get_attendance_interactive(conn, device_ip, users):
             save_to_db = input("\nSave to SQLite database? (y/N): ").strip().lower()
             if save_to_db in ("y", "yes"):
                 # Build mapping uid/user_id -> name from users
-                users_dict = {}
-                for user in users:
-                    users_dict[str(user.uid)] = user.name or ""
-                    users_dict[user.user_id] = user.name or ""
+                users_dict = build_users_dict(users)
 
                 save_attendance_to_db(attendances, device_ip, users_dict)
 
@@ -605,13 +986,9 @@ def live_capture_interactive(conn, users):
         print("="*80 + "\n")
 
         # Build mapping uid/user_id -> name from users
-        users_dict = {}
-        for user in users:
-            users_dict[str(user.uid)] = user.name or ""
-            users_dict[user.user_id] = user.name or ""
+        users_dict = build_users_dict(users)
 
         headers = ["#", "UID", "User ID", "Name", "Timestamp", "Status"]
-        status_map = {0: "Check-In", 1: "Check-Out", 2: "Break-Out", 3: "Break-In", 4: "OT-In", 5: "OT-Out"}
 
         print("Waiting for live data from the device...")
         print()
@@ -621,10 +998,44 @@ def live_capture_interactive(conn, users):
 
         widths = [len(h) for h in headers]
 
+        # The receive loop only queues events; a render thread formats and writes them
+        # in one batch per tick so terminal I/O never stalls reading from the device
+        events = deque(maxlen=LIVE_BUFFER_SIZE)
+        stop = threading.Event()
+
+        header_done = False
+
+        def render_pending():
+            nonlocal header_done
+            rows = []
+            while events:
+                rows.append(events.popleft())
+            if not rows:
+                return
+            for row in rows:
+                for idx, val in enumerate(row):
+                    widths[idx] = max(widths[idx], len(val))
+            lines = []
+            if not header_done:
+                lines.append(" | ".join(h.ljust(w) for h, w in zip(headers, widths)))
+                lines.append("-+-".join("-" * w for w in widths))
+                header_done = True
+            lines.extend(" | ".join(val.ljust(w) for val, w in zip(row, widths)) for row in rows)
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
+        def render_loop():
+            while not stop.wait(LIVE_RENDER_INTERVAL):
+                render_pending()
+
+        renderer = threading.Thread(target=render_loop, daemon=True)
+        renderer.start()
+
+        interrupted = False
         try:
             for att in conn.live_capture():
                 # Check user input (non-blocking)
-                import sys, select
+                import select
                 if sys.platform != 'win32':
                     # Linux/Mac - use select
                     if select.select([sys.stdin], [], [], 0)[0]:
@@ -649,30 +1060,25 @@ def live_capture_interactive(conn, users):
                 uid = str(getattr(att, 'uid', ''))
                 user_id = str(getattr(att, 'user_id', ''))
                 timestamp = str(getattr(att, 'timestamp', ''))
-                status_code = getattr(att, 'status', None)
-                status = status_map.get(status_code, str(status_code)) if status_code is not None else ''
-
-                name = users_dict.get(uid, "") or users_dict.get(user_id, "")
-
-                row = [str(counter), uid, user_id, name, timestamp, status]
-
-                for idx, val in enumerate(row):
-                    if idx < len(widths):
-                        widths[idx] = max(widths[idx], len(val))
+                status = _status_label(getattr(att, 'status', None))
 
-                def fmt_row(values):
-                    return " | ".join(val.ljust(w) for val, w in zip(values, widths))
+                # One lookup in the common case: user_id is the canonical key
+                name = users_dict.get(user_id or uid)
+                if name is None:
+                    name = users_dict.get(uid, "")
 
-                if counter == 1:
-                    print(fmt_row(headers))
-                    line = "-+-".join("-" * w for w in widths)
-                    print(line)
-
-                print(fmt_row(row))
+                events.append((str(counter), uid, user_id, name, timestamp, status))
 
         except KeyboardInterrupt:
+            interrupted = True
+        finally:
+            stop.set()
+            renderer.join()
+            # Flush whatever arrived after the last tick, before the stop banner
+            render_pending()
+
+        if interrupted:
             print("\n\n[Live capture stopped]")
-
         print("\n" + "="*80)
         print(f"Total captured events: {captured_events}")
         print("="*80 + "\n")
@@ -682,10 +1088,11 @@ def live_capture_interactive(conn, users):
 
 
 def create_user_interactive(conn):
+    # Returns the created User (for patching the cached list), None when skipped/failed
     answer = input("Do you want to create a new user? (y/N): ").strip().lower()
     if answer not in ("y", "yes"):
         print("Skipped creating a new user.")
-        return
+        return None
 
     def prompt(default, label):
         value = input(f"{label} [{default}]: ").strip()
@@ -694,7 +1101,7 @@ def create_user_interactive(conn):
     uid = int(prompt("1337", "UID (employee number - 0-65535)"))
     name = prompt("Nguyen Huy Vinh", "Name (Employee name)")
     privilege_input = prompt("Admin", "Privilege (Admin/User)")
-    privilege = const.USER_ADMIN if privilege_input == "Admin" else const.USER_DEFAULT
+    privilege = _ADMIN if privilege_input == "Admin" else _DEFAULT
     password = prompt("1337", "Password")
     group_id = prompt("", "Group ID (group - 0-65535)")
     user_id = prompt("01337", "User ID (employee code)")
@@ -711,8 +1118,10 @@ def create_user_interactive(conn):
             card=card,
         )
         print(f"✓ New user created successfully: UID={uid}, Name={name}, User ID={user_id}")
+        return User(uid, name, privilege, password, group_id, user_id, card)
     except Exception as err:
         print(f"✗ Failed to create user: {err}")
+        return None
 
 
 def delete_user_interactive(conn, users):
@@ -736,11 +1145,7 @@ def delete_user_interactive(conn, users):
 
     try:
         uid = int(uid_input)
-        user_found = None
-        for user in users:
-            if user.uid == uid:
-                user_found = user
-                break
+        user_found = _by_uid(users).get(uid)
 
         if not user_found:
             print(f"✗ User not found with UID={uid}")
@@ -755,7 +1160,10 @@ def delete_user_interactive(conn, users):
         if confirm == "yes":
             conn.delete_user(uid)
             print(f"✓ User deleted successfully: UID={uid}, Name={user_found.name}")
-            return conn.get_users()
+            # Drop it locally instead of downloading the whole list again
+            users = UserIndex.of(users)
+            users.remove_uid(uid)
+            return users
         else:
             print("Delete canceled.")
             return users
@@ -783,11 +1191,7 @@ def edit_user_interactive(conn, users):
 
     try:
         uid = int(uid_input)
-        user_found = None
-        for user in users:
-            if user.uid == uid:
-                user_found = user
-                break
+        user_found = _by_uid(users).get(uid)
 
         if not user_found:
             print(f"✗ User not found with UID={uid}")
@@ -807,9 +1211,9 @@ def edit_user_interactive(conn, users):
 
         privilege_input = prompt_with_default(
             "Privilege (Admin/User)",
-            "Admin" if user_found.privilege == const.USER_ADMIN else "User"
+            "Admin" if user_found.privilege == _ADMIN else "User"
         )
-        new_privilege = const.USER_ADMIN if privilege_input == "Admin" else const.USER_DEFAULT
+        new_privilege = _ADMIN if privilege_input == "Admin" else _DEFAULT
 
         new_password = prompt_with_default("Password", user_found.password or "")
         new_group_id = prompt_with_default("Group ID", user_found.group_id or "")
@@ -817,7 +1221,7 @@ def edit_user_interactive(conn, users):
 
         new_card_str = prompt_with_default(
             "Card",
-            user_found.card if hasattr(user_found, 'card') and user_found.card else "0"
+            _card(user_found) or "0"
         )
         try:
             new_card = int(new_card_str) if new_card_str else 0
@@ -827,7 +1231,7 @@ def edit_user_interactive(conn, users):
         print(f"\n--- New information ---")
         print(f"UID: {new_uid}")
         print(f"Name: {new_name}")
-        print(f"Privilege: {'Admin' if new_privilege == const.USER_ADMIN else 'User'}")
+        print(f"Privilege: {'Admin' if new_privilege == _ADMIN else 'User'}")
         print(f"Password: {new_password}")
         print(f"Group ID: {new_group_id}")
         print(f"User ID: {new_user_id}")
@@ -846,7 +1250,11 @@ def edit_user_interactive(conn, users):
                 card=new_card,
             )
             print(f"✓ User updated successfully: UID={new_uid}, Name={new_name}")
-            return conn.get_users()
+            # Patch locally instead of downloading the whole list again (a changed UID
+            # writes a new record on the device, the old UID entry stays)
+            return _upsert_user(users, User(
+                new_uid, new_name, new_privilege, new_password, new_group_id, new_user_id, new_card
+            ))
         else:
             print("Edit canceled.")
             return users
@@ -866,91 +1274,176 @@ def get_device_ip():
     return ip_input if ip_input else default_ip
 
 
+# Menu rendered once at import; show_menu writes it in one call
+_MENU_TEXT = "\n".join([
+    "",
+    "="*50,
+    "USER MANAGEMENT MENU - ZK TECO",
+    "="*50,
+    "1. View all users",
+    "2. Create new user",
+    "3. Edit user",
+    "4. Delete user",
+    "5. Find Admin users",
+    "6. Search user by User ID",
+    "7. Search user by Name",
+    "8. View attendance data",
+    "9. View LIVE capture from device",
+    "10. View device list",
+    "11. Sync USERS from ALL devices",
+    "12. Sync ATTENDANCE from ALL devices",
+    "13. Re-enter attendance device IP",
+    "0. Exit",
+    "="*50,
+]) + "\n"
+_MENU_PROMPT = "Select function (0-13): "
+
+
 def show_menu():
-    print("\n" + "="*50)
-    print("USER MANAGEMENT MENU - ZK TECO")
-    print("="*50)
-    print("1. View all users")
-    print("2. Create new user")
-    print("3. Edit user")
-    print("4. Delete user")
-    print("5. Find Admin users")
-    print("6. Search user by User ID")
-    print("7. Search user by Name")
-    print("8. View attendance data")
-    print("9. View LIVE capture from device")
-    print("10. View device list")
-    print("11. Sync USERS from ALL devices")
-    print("12. Sync ATTENDANCE from ALL devices")
-    print("13. Re-enter attendance device IP")
-    print("0. Exit")
-    print("="*50)
-
-
-def handle_menu_option(option, conn, users, device_ip, devices):
-    if option == "1":
-        print("\n--- All users ---")
-        if users:
-            print_users_table(users)
-        else:
-            print("No users found.")
-    elif option == "2":
-        create_user_interactive(conn)
-        return conn.get_users(), device_ip
-    elif option == "3":
-        users = edit_user_interactive(conn, users)
-        return users, device_ip
-    elif option == "4":
-        users = delete_user_interactive(conn, users)
-        return users, device_ip
-    elif option == "5":
-        search_user_admin(users)
-    elif option == "6":
-        search_user_by_id(users)
-    elif option == "7":
-        search_user_by_name(users)
-    elif option == "8":
-        get_attendance_interactive(conn, device_ip, users)
-    elif option == "9":
-        live_capture_interactive(conn, users)
-    elif option == "10":
-        print("\n--- Device list management ---")
-        selected_ip = select_device(devices)
-        if selected_ip:
-            device_ip = selected_ip
-            show_device_info(devices, device_ip)
-        return users, device_ip
-    elif option == "11":
-        sync_all_devices_users(devices)
-        if conn:
-            users = conn.get_users()
-        return users, device_ip
-    elif option == "12":
-        sync_all_devices_attendance(devices)
-        return users, device_ip
-    elif option == "13":
-        return users, "change_ip"
-    elif option == "0":
-        print("Exiting...")
-        return None, None
-    return users, device_ip
+    sys.stdout.write(_MENU_TEXT)
+
+
+class IpState(enum.Enum):
+    """Where the session stands on choosing a device"""
+    UNSET = 0   # nothing chosen yet: pick from the device list
+    CHANGE = 1  # user asked to switch: list or manual IP
+    SET = 2     # device_ip is the device to use
+
+
+# Menu actions: each takes (conn, users, device_ip, devices, devices_by_ip) and returns
+# (users, device_ip, IpState), or None to exit
+
+def _opt_list_users(conn, users, device_ip, devices, devices_by_ip):
+    print("\n--- All users ---")
+    if users:
+        print_users_table(users)
+    else:
+        print("No users found.")
+    return users, device_ip, IpState.SET
+
+
+def _opt_create_user(conn, users, device_ip, devices, devices_by_ip):
+    new_user = create_user_interactive(conn)
+    if new_user is not None:
+        users = _upsert_user(users, new_user)
+    return users, device_ip, IpState.SET
+
+
+def _opt_edit_user(conn, users, device_ip, devices, devices_by_ip):
+    return edit_user_interactive(conn, users), device_ip, IpState.SET
+
+
+def _opt_delete_user(conn, users, device_ip, devices, devices_by_ip):
+    return delete_user_interactive(conn, users), device_ip, IpState.SET
+
+
+def _opt_find_admins(conn, users, device_ip, devices, devices_by_ip):
+    search_user_admin(users)
+    return users, device_ip, IpState.SET
+
+
+def _opt_search_by_id(conn, users, device_ip, devices, devices_by_ip):
+    search_user_by_id(users)
+    return users, device_ip, IpState.SET
+
+
+def _opt_search_by_name(conn, users, device_ip, devices, devices_by_ip):
+    search_user_by_name(users)
+    return users, device_ip, IpState.SET
+
+
+def _opt_attendance(conn, users, device_ip, devices, devices_by_ip):
+    get_attendance_interactive(conn, device_ip, users)
+    return users, device_ip, IpState.SET
+
+
+def _opt_live_capture(conn, users, device_ip, devices, devices_by_ip):
+    live_capture_interactive(conn, users)
+    return users, device_ip, IpState.SET
+
+
+def _opt_device_list(conn, users, device_ip, devices, devices_by_ip):
+    print("\n--- Device list management ---")
+    selected_ip = select_device(devices)
+    if selected_ip:
+        device_ip = selected_ip
+        show_device_info(devices_by_ip, device_ip)
+    return users, device_ip, IpState.SET
+
+
+def _opt_sync_users(conn, users, device_ip, devices, devices_by_ip):
+    synced = sync_all_devices_users(devices)
+    # Reuse the list fetched for the current device during the sync
+    if device_ip in synced:
+        users = UserIndex(synced[device_ip])
+    return users, device_ip, IpState.SET
+
+
+def _opt_sync_attendance(conn, users, device_ip, devices, devices_by_ip):
+    sync_all_devices_attendance(devices)
+    return users, device_ip, IpState.SET
+
+
+def _opt_change_device(conn, users, device_ip, devices, devices_by_ip):
+    return users, device_ip, IpState.CHANGE
+
+
+def _opt_exit(conn, users, device_ip, devices, devices_by_ip):
+    print("Exiting...")
+    return None
+
+
+_DISPATCH = {
+    "1": _opt_list_users,
+    "2": _opt_create_user,
+    "3": _opt_edit_user,
+    "4": _opt_delete_user,
+    "5": _opt_find_admins,
+    "6": _opt_search_by_id,
+    "7": _opt_search_by_name,
+    "8": _opt_attendance,
+    "9": _opt_live_capture,
+    "10": _opt_device_list,
+    "11": _opt_sync_users,
+    "12": _opt_sync_attendance,
+    "13": _opt_change_device,
+    "0": _opt_exit,
+}
+_VALID = frozenset(_DISPATCH)
+
+
+def handle_menu_option(option, conn, users, device_ip, devices, devices_by_ip):
+    """Run one menu option, return (users, device_ip, IpState) or None to exit"""
+    action = _DISPATCH.get(option)
+    if action is None:
+        return users, device_ip, IpState.SET
+    return action(conn, users, device_ip, devices, devices_by_ip)
 
 
 conn = None
-device_ip = "192.168.1.30"
+device_ip = None
+ip_state = IpState.UNSET
+
+# Device round-trips that overlap with prompts run here; a single worker keeps the
+# pyzk connection (one socket, one reply counter) used by only one thread at a time
+device_io = ThreadPoolExecutor(max_workers=1)
+leave_task = None
 
 # Initialize database
 init_database()
 
 # Load device list
-devices = load_devices("devices.json")
+devices, devices_by_ip = get_devices("devices.json")
 print(f"Loaded {len(devices)} devices from config file")
 
 try:
     while True:
+        # Pick up edits to devices.json between sessions (cheap stat when unchanged)
+        devices, devices_by_ip = get_devices("devices.json")
+
         # Ask for IP at start or when changed
-        if device_ip == "192.168.1.30" or device_ip == "change_ip":
-            if device_ip == "change_ip":
+        if ip_state is not IpState.SET:
+            if ip_state is IpState.CHANGE:
                 print("\nSelect attendance device:")
                 print("1. Choose from list")
                 print("2. Enter IP manually")
@@ -967,77 +1460,86 @@ try:
                 selected_ip = select_device(devices)
                 if selected_ip:
                     device_ip = selected_ip
-                    show_device_info(devices, device_ip)
+                    show_device_info(devices_by_ip, device_ip)
                 else:
                     device_ip = input("Enter attendance device IP: ").strip()
+            ip_state = IpState.SET
 
-        # Create ZK instance
-        # Improvement: increase timeout, use force_udp=True (ZK Teco often uses UDP)
-        zk = ZK(device_ip, port=4370, timeout=30, password=0, force_udp=True, ommit_ping=False)
+        active_ip = device_ip
         try:
-            # Connect to device
+            if leave_task is not None:
+                # The previous device must finish its goodbye before the pool is touched
+                try:
+                    leave_task.result()
+                except Exception as e:
+                    print(f"⚠️  Could not re-enable previous device: {e}")
+                leave_task = None
+
+            # Connect to device; connections are pooled per IP across device switches
             print(f"-> Connecting to device {device_ip}...")
-            show_device_info(devices, device_ip)
-            conn = zk.connect()
+            show_device_info(devices_by_ip, device_ip)
+            conn, users = get_conn(device_ip)
             print("-> Connected successfully!")
             # Disable device during operations
             print("-> Disabling device...")
-            conn.disable_device()
-            print("-> Device disabled")
 
-            # Fetch initial users list
-            print("Fetching users list...")
-            users = conn.get_users()
-            print(f"Total users: {len(users)}")
-            export_users_csv(users, device_ip)
+            if users is not None:
+                conn.disable_device()
+                print("-> Device disabled")
+                print(f"Using cached users list. Total users: {len(users)}")
+            else:
+                # Disable + users download run in the background while the user answers
+                print("Fetching users list...")
+                users_task = device_io.submit(_open_session, conn)
+
+                # Save users to database
+                save_users = input("Save user list to database? (y/N): ").strip().lower()
 
-            # Save users to database
-            save_users = input("Save user list to database? (y/N): ").strip().lower()
-            if save_users in ("y", "yes"):
-                save_users_to_db(users, device_ip)
+                users = UserIndex(users_task.result())
+                print("-> Device disabled")
+                print(f"Total users: {len(users)}")
+                export_users_csv(users, device_ip)
+                if save_users in ("y", "yes"):
+                    save_users_to_db(users, device_ip)
 
             # Interactive menu loop
             change_ip = False
             while True:
                 show_menu()
-                choice = input("Select function (0-13): ").strip()
+                choice = input(_MENU_PROMPT).strip()
 
-                if choice not in ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12", "13"):
+                if choice not in _VALID:
                     print("Invalid option. Please choose 0-13.")
                     continue
 
-                result = handle_menu_option(choice, conn, users, device_ip, devices)
-                if result is None or result == (None, None):
+                result = handle_menu_option(choice, conn, users, device_ip, devices, devices_by_ip)
+                if result is None:
                     change_ip = False
                     break
-                elif isinstance(result, tuple):
-                    users, new_device_ip = result
-                    if new_device_ip == "change_ip":
-                        change_ip = True
-                        break
-                    elif new_device_ip != device_ip:
-                        device_ip = new_device_ip
-                        change_ip = True
-                        break
+                users, new_device_ip, ip_state = result
+                if ip_state is IpState.CHANGE or new_device_ip != device_ip:
                     device_ip = new_device_ip
-                else:
-                    users = result
+                    change_ip = True
+                    break
 
             if not change_ip:
                 break
 
-            # Test voice: say thank you
-            conn.test_voice()
-            # Re-enable device after all commands executed
-            conn.enable_device()
-            conn.disconnect()
+            # Test voice (say thank you) and re-enable the device in the background while
+            # the next device is chosen; keep the connection pooled so switching back
+            # to this device skips the reconnect
+            leave_task = device_io.submit(_close_session, conn)
+            cache_pool_users(active_ip, users)
         except Exception as e:
             print(f"Connection error: {e}")
+            drop_conn(active_ip)
             retry = input("Retry connection? (y/N): ").strip().lower()
             if retry not in ("y", "yes"):
                 break
 except Exception as e:
     print("Process terminate : {}".format(e))
 finally:
-    if conn:
-        conn.disconnect()
+    # Let a pending goodbye finish before the sockets are closed
+    device_io.shutdown(wait=True)
+    close_conn_pool()
+    close_db()